@@ -7,7 +7,7 @@ from enum import Enum
 from typing import Any, Dict, List, Optional, Tuple
 
 from fastapi import Depends, FastAPI, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, ORJSONResponse
 from pydantic import BaseModel, Field, model_validator
 
 from ai_influencer.webapp.influencers import (
@@ -195,12 +195,14 @@ class InfluencerCreateRequest(BaseModel):
 
 
 @app.get("/api/models")
-async def list_models(client: OpenRouterClient = Depends(get_client)) -> JSONResponse:
+async def list_models(client: OpenRouterClient = Depends(get_client)) -> ORJSONResponse:
     try:
         models = await client.list_models()
+    except OpenRouterError as exc:
+        raise HTTPException(status_code=502, detail=str(exc)) from exc
     finally:
         await client.close()
-    return JSONResponse({"models": summarize_models(models)})
+    return ORJSONResponse({"models": summarize_models(models)})
 
 
 
@@ -208,7 +210,7 @@ async def list_models(client: OpenRouterClient = Depends(get_client)) -> JSONRes
 async def generate_text(
     payload: TextGenerationRequest,
     client: OpenRouterClient = Depends(get_client),
-) -> JSONResponse:
+) -> ORJSONResponse:
     try:
         story, personality = _resolve_influencer_context(payload)
         enriched_prompt = _enrich_text_prompt(payload.prompt, story, personality)
@@ -219,28 +221,28 @@ async def generate_text(
         raise HTTPException(status_code=502, detail=str(exc)) from exc
     finally:
         await client.close()
-    return JSONResponse({"content": result})
+    return ORJSONResponse({"content": result})
 
 
 @app.post("/api/tokenize")
 async def count_tokens(
     payload: TokenUsageRequest,
     client: OpenRouterClient = Depends(get_client),
-) -> JSONResponse:
+) -> ORJSONResponse:
     try:
         usage = await client.count_tokens(payload.model, payload.prompt)
     except OpenRouterError as exc:
         raise HTTPException(status_code=502, detail=str(exc)) from exc
     finally:
         await client.close()
-    return JSONResponse({"usage": usage})
+    return ORJSONResponse({"usage": usage})
 
 
 @app.post("/api/generate/image")
 async def generate_image(
     payload: ImageGenerationRequest,
     client: OpenRouterClient = Depends(get_client),
-) -> JSONResponse:
+) -> ORJSONResponse:
     try:
         story, personality = _resolve_influencer_context(payload)
         enriched_prompt = _enrich_visual_prompt(payload.prompt, story, personality)
@@ -276,7 +278,7 @@ async def generate_image(
     # Ensure payload is always base64 encoded for inline display when possible
     if blob.get("b64_json") is None and content.startswith("http"):
         # Do not attempt to inline remote URLs, return as-is
-        return JSONResponse({"image": content, "is_remote": True})
+        return ORJSONResponse({"image": content, "is_remote": True})
 
     try:
         # Validate base64 formatting for inline display
@@ -284,14 +286,14 @@ async def generate_image(
     except Exception as exc:  # pragma: no cover - defensive path
         raise HTTPException(status_code=500, detail="Invalid image encoding") from exc
 
-    return JSONResponse({"image": content, "is_remote": False})
+    return ORJSONResponse({"image": content, "is_remote": False})
 
 
 @app.post("/api/generate/video")
 async def generate_video(
     payload: VideoGenerationRequest,
     client: OpenRouterClient = Depends(get_client),
-) -> JSONResponse:
+) -> ORJSONResponse:
     try:
         story, personality = _resolve_influencer_context(payload)
         enriched_prompt = _enrich_video_prompt(payload.prompt, story, personality)
@@ -315,14 +317,14 @@ async def generate_video(
     if not isinstance(blob, dict):
         raise HTTPException(status_code=500, detail="Invalid video payload")
     if blob.get("url"):
-        return JSONResponse({"video": blob["url"], "is_remote": True})
+        return ORJSONResponse({"video": blob["url"], "is_remote": True})
     if blob.get("b64_json"):
-        return JSONResponse({"video": blob["b64_json"], "is_remote": False})
+        return ORJSONResponse({"video": blob["b64_json"], "is_remote": False})
     raise HTTPException(status_code=500, detail="Unsupported video payload")
 
 
 @app.post("/api/influencers", status_code=201)
-async def create_influencer(payload: InfluencerCreateRequest) -> JSONResponse:
+async def create_influencer(payload: InfluencerCreateRequest) -> ORJSONResponse:
     identifier = payload.identifier.strip()
     if not identifier:
         raise HTTPException(status_code=422, detail="Identifier is required")
@@ -351,7 +353,7 @@ async def create_influencer(payload: InfluencerCreateRequest) -> JSONResponse:
             status_code=422, detail="Impossibile determinare l'handle"
         ) from exc
 
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=201,
         content={
             "handle": record.handle,
@@ -366,7 +368,7 @@ async def create_influencer(payload: InfluencerCreateRequest) -> JSONResponse:
 
 
 @app.get("/api/influencers/{identifier}")
-async def get_influencer(identifier: str) -> JSONResponse:
+async def get_influencer(identifier: str) -> ORJSONResponse:
 
     normalized = identifier.strip()
     if not normalized:
@@ -389,7 +391,7 @@ async def get_influencer(identifier: str) -> JSONResponse:
     if stored.contents is not None:
         payload["contents"] = stored.contents
 
-    return JSONResponse(payload)
+    return ORJSONResponse(payload)
 
     record = influencer_store.get(identifier)
     if record is None:
@@ -410,7 +412,7 @@ async def get_influencer(identifier: str) -> JSONResponse:
 
 
 @app.post("/api/influencer")
-async def influencer_lookup(payload: InfluencerLookupRequest) -> JSONResponse:
+async def influencer_lookup(payload: InfluencerLookupRequest) -> ORJSONResponse:
     identifier = payload.identifier.strip()
     if not identifier:
         raise HTTPException(status_code=422, detail="Identifier is required")
@@ -513,7 +515,7 @@ async def influencer_lookup(payload: InfluencerLookupRequest) -> JSONResponse:
         if stored.contents is not None:
             payload_data["contents"] = stored.contents
 
-    return JSONResponse(payload_data)
+    return ORJSONResponse(payload_data)
 
 
 @app.get("/healthz")
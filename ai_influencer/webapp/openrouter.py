@@ -90,6 +90,11 @@ class OpenRouterClient:
             self._model_cache = (now, models)
             return models
 
+    def invalidate_models_cache(self) -> None:
+        """Drop cached models so the next ``list_models`` call refetches them."""
+
+        self._model_cache = None
+
     async def generate_text(self, model: str, prompt: str) -> str:
         payload = {
             "model": model,
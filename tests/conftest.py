@@ -0,0 +1,51 @@
+"""Shared pytest configuration for the test suite."""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Iterator, TypeVar
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from ai_influencer.webapp.main import app
+
+T = TypeVar("T")
+
+
+@pytest.fixture(scope="session")
+def client() -> Iterator[TestClient]:
+    with TestClient(app, follow_redirects=False) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def override_dep(
+    monkeypatch: pytest.MonkeyPatch,
+) -> Callable[[Callable[..., Any], Any], Any]:
+    """Resolve a FastAPI dependency to ``stub`` for the duration of one test."""
+
+    def _override(dependency: Callable[..., Any], stub: Any) -> Any:
+        async def _resolve() -> Any:
+            return stub
+
+        monkeypatch.setitem(app.dependency_overrides, dependency, _resolve)
+        return stub
+
+    return _override
+
+
+@pytest.fixture
+def run_scenario() -> Callable[[Callable[[httpx.AsyncClient], Awaitable[T]]], T]:
+    """Run an async scenario against the app through an in-process ASGI transport."""
+
+    def _run(scenario: Callable[[httpx.AsyncClient], Awaitable[T]]) -> T:
+        async def _main() -> T:
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(
+                transport=transport, base_url="http://test"
+            ) as aclient:
+                return await scenario(aclient)
+
+        return asyncio.run(_main())
+
+    return _run
@@ -1,16 +1,9 @@
 import asyncio
 from typing import Any, Dict, Optional
 
-import pathlib
-import sys
-
 import httpx
 import pytest
 
-ROOT = pathlib.Path(__file__).resolve().parents[1]
-if str(ROOT) not in sys.path:
-    sys.path.insert(0, str(ROOT))
-
 from ai_influencer.scripts.openrouter_models import MODEL_PRESETS, resolve_model_alias
 from ai_influencer.webapp.openrouter import (
     OpenRouterClient,
@@ -74,7 +67,6 @@ def test_list_models_refreshes_after_ttl_expiry() -> None:
 
         try:
             first = await client.list_models()
-            await asyncio.sleep(0)
             second = await client.list_models()
         finally:
             await client.close()
@@ -85,6 +77,34 @@ def test_list_models_refreshes_after_ttl_expiry() -> None:
     asyncio.run(scenario())
 
 
+def test_list_models_refetches_after_cache_invalidation() -> None:
+    call_count = 0
+
+    async def scenario() -> None:
+        nonlocal call_count
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            nonlocal call_count
+            call_count += 1
+            return httpx.Response(200, json={"data": [{"id": f"model-{call_count}"}]})
+
+        transport = httpx.MockTransport(handler)
+        client = OpenRouterClient(models_ttl=60, transport=transport)
+
+        try:
+            first = await client.list_models()
+            client.invalidate_models_cache()
+            second = await client.list_models()
+        finally:
+            await client.close()
+
+        assert call_count == 2
+        assert first == [{"id": "model-1"}]
+        assert second == [{"id": "model-2"}]
+
+    asyncio.run(scenario())
+
+
 def test_list_models_raises_on_failure_status() -> None:
     transport = make_transport({"/models": httpx.Response(500, json={"error": "boom"})})
 
@@ -270,13 +290,39 @@ def test_summarize_models_orders_by_name() -> None:
     assert [item["id"] for item in summary] == ["alpha", "beta"]
 
 
-def test_resolve_model_alias_is_case_insensitive() -> None:
-    assert resolve_model_alias("SDXL") == MODEL_PRESETS["sdxl"]
+@pytest.mark.parametrize(
+    "model, expected",
+    [
+        pytest.param(
+            {"id": "m1", "pricing": {"input": "0.0005", "output": "0.001"}},
+            "Output: $0.001",
+            id="output-over-input",
+        ),
+        pytest.param(
+            {"id": "m2", "pricing": {"video": "0.01"}}, "Video: $0.01", id="video"
+        ),
+        pytest.param({"id": "m3", "pricing": {}}, None, id="empty"),
+    ],
+)
+def test_summarize_models_builds_pricing_display(
+    model: dict[str, Any], expected: Optional[str]
+) -> None:
+    assert summarize_models([model])[0]["pricing_display"] == expected
 
 
-def test_resolve_model_alias_passthrough_for_custom_ids() -> None:
-    custom = "my-org/custom-model"
-    assert resolve_model_alias(custom) == custom
+@pytest.mark.parametrize(
+    "alias, expected",
+    [
+        ("SDXL", MODEL_PRESETS["sdxl"]),
+        ("sdxl", MODEL_PRESETS["sdxl"]),
+        ("  Flux-Dev  ", MODEL_PRESETS["flux-dev"]),
+        ("my-org/custom-model", "my-org/custom-model"),
+        ("  my-org/custom-model ", "my-org/custom-model"),
+        ("", ""),
+    ],
+)
+def test_resolve_model_alias(alias: str, expected: str) -> None:
+    assert resolve_model_alias(alias) == expected
 
 
 def test_openrouter_client_reuses_external_httpx_client() -> None:
@@ -358,12 +404,12 @@ def test_count_tokens_combines_prompt_and_completion_when_total_missing() -> Non
 @pytest.mark.parametrize(
     "value, expected",
     [
-        (None, None),
-        ("invalid", None),
-        (float("inf"), None),
-        ("0.0005", "$0.0005"),
-        ("0.05", "$0.05"),
-        ("2", "$2"),
+        pytest.param(None, None, id="none"),
+        pytest.param("invalid", None, id="non-numeric"),
+        pytest.param(float("inf"), None, id="infinite"),
+        pytest.param("0.0005", "$0.0005", id="sub-cent"),
+        pytest.param("0.05", "$0.05", id="cents"),
+        pytest.param("2", "$2", id="whole"),
     ],
 )
 def test_format_pricing_amount_handles_various_inputs(value: Any, expected: Optional[str]) -> None:
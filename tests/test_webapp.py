@@ -1,344 +1,382 @@
 """Tests for the FastAPI web application endpoints."""
 
+import asyncio
 import base64
-import sys
-from pathlib import Path
-from typing import Optional
-
-sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+import inspect
+from typing import Annotated, Any, Callable, Dict, Iterator, List, Optional
+from unittest.mock import AsyncMock, NonCallableMagicMock, create_autospec
 
 from fastapi.testclient import TestClient
+import httpx
+import orjson
+from pydantic import AnyUrl, BaseModel, Field, TypeAdapter, UrlConstraints
 import pytest
 
-from ai_influencer.webapp.main import INFLUENCER_STORE, app, get_client
+from ai_influencer.webapp.main import INFLUENCER_STORE, get_client
 
 from ai_influencer.webapp.influencers import get_influencer_store
 
-from ai_influencer.webapp.openrouter import OpenRouterError, summarize_models
-
-
-client = TestClient(app, raise_server_exceptions=False)
+from ai_influencer.webapp.openrouter import OpenRouterClient, OpenRouterError
 
 DEFAULT_CONTEXT = {
     "story": "Creatrice digitale che ama sperimentare con estetiche futuristiche.",
     "personality": "Voce empatica e curiosa, capace di trasmettere energia positiva.",
 }
 
+_INLINE_PIXEL_B64 = base64.b64encode(b"pixel").decode()
+_INLINE_VIDEO_B64 = base64.b64encode(b"fake-video-data").decode()
 
-def test_healthcheck_returns_ok_payload():
-    response = client.get("/healthz")
-
-    assert response.status_code == 200
-    assert response.json() == {"status": "ok"}
-
-
-def test_docs_endpoint_is_available():
-    response = client.get("/docs")
-
-    assert response.status_code == 200
-    assert "Swagger UI" in response.text
-
-
-def test_openapi_schema_is_available():
-    response = client.get("/openapi.json")
-
-    assert response.status_code == 200
-    schema = response.json()
-    assert schema["info"]["title"] == "AI Influencer Control Hub"
-
-
-def test_list_models_returns_summarized_payload_and_closes_client():
-    class StubClient:
-        def __init__(self) -> None:
-            self.close_called = False
-            self.models = [
-                {
-                    "id": "openrouter/model-1",
-                    "name": "Model One",
-                    "owned_by": "openrouter",
-                    "context_length": 8192,
-                    "pricing": {"input": "0.0005", "output": "0.001"},
-                    "architecture": {"modality": ["text", "image"]},
-                },
-                {
-                    "id": "openrouter/model-2",
-                    "name": "Model Two",
-                    "owned_by": "openrouter",
-                    "pricing": {"video": "0.01"},
-                    "tags": ["beta"],
-                },
-            ]
-
-        async def list_models(self):
-            return self.models
-
-        async def close(self):
-            self.close_called = True
-
-    stub_client = StubClient()
-    app.dependency_overrides[get_client] = lambda: stub_client
-    try:
-        response = client.get("/api/models")
-    finally:
-        app.dependency_overrides.pop(get_client, None)
-
-    assert response.status_code == 200
-    payload = response.json()
-    assert payload == {"models": summarize_models(stub_client.models)}
-    pricing_displays = [model["pricing_display"] for model in payload["models"]]
-    assert pricing_displays == ["Output: $0.001", "Video: $0.01"]
-    assert stub_client.close_called is True
-
-
-def test_list_models_handles_openrouter_error_and_closes_client():
-    class ErrorStubClient:
-        def __init__(self) -> None:
-            self.close_called = False
-
-        async def list_models(self):
-            raise OpenRouterError("Unable to fetch")
-
-        async def close(self):
-            self.close_called = True
-
-    stub_client = ErrorStubClient()
-    app.dependency_overrides[get_client] = lambda: stub_client
-    try:
-        response = client.get("/api/models")
-    finally:
-        app.dependency_overrides.pop(get_client, None)
-
-    assert response.status_code == 500
-    assert response.text == "Internal Server Error"
-    assert stub_client.close_called is True
-
-
-class StubTextClient:
-    """Minimal async client stub for exercising the text generation route."""
-
-    def __init__(self, *, result: str = "stub-response", error: Exception | None = None) -> None:
-        self._result = result
-        self._error = error
-        self.closed = False
-        self.calls: list[tuple[str, str]] = []
+_JSON_HEADERS = {"content-type": "application/json"}
+_ROUTE_METHODS = {
+    "/api/generate/image": "generate_image",
+    "/api/generate/video": "generate_video",
+    "/api/generate/text": "generate_text",
+}
+_IMAGE_BODY = orjson.dumps({"model": "stub", "prompt": "draw", **DEFAULT_CONTEXT})
+_VIDEO_BODY = orjson.dumps(
+    {"model": "demo/video", "prompt": "A sunny day", **DEFAULT_CONTEXT}
+)
+_TEXT_BODY = orjson.dumps({"model": "meta/llama", "prompt": "Hello", **DEFAULT_CONTEXT})
+_TOKENIZE_BODY = orjson.dumps({"model": "meta/llama", "prompt": "Sample"})
+
+_REMOTE_IMAGE_PAYLOAD = {"data": [{"url": "https://cdn.example.com/image.png"}]}
+_INLINE_IMAGE_PAYLOAD = {"data": [{"b64_json": _INLINE_PIXEL_B64}]}
+_BAD_B64_IMAGE_PAYLOAD = {"data": [{"b64_json": "not-base64??"}]}
+
+_STUB_MODELS = (
+    {
+        "id": "openrouter/model-1",
+        "name": "Model One",
+        "owned_by": "openrouter",
+        "context_length": 8192,
+        "pricing": {"input": "0.0005", "output": "0.001"},
+        "architecture": {"modality": ["text", "image"]},
+    },
+    {
+        "id": "openrouter/model-2",
+        "name": "Model Two",
+        "owned_by": "openrouter",
+        "pricing": {"video": "0.01"},
+        "tags": ["beta"],
+    },
+)
 
-    async def generate_text(self, model: str, prompt: str) -> str:
-        self.calls.append((model, prompt))
-        if self._error:
-            raise self._error
-        return self._result
+EXPECTED_MODELS = [
+    {
+        "id": "openrouter/model-1",
+        "name": "Model One",
+        "provider": "openrouter",
+        "capabilities": ["image", "text"],
+        "context_length": 8192,
+        "pricing": {"input": "0.0005", "output": "0.001"},
+        "pricing_display": "Output: $0.001",
+    },
+    {
+        "id": "openrouter/model-2",
+        "name": "Model Two",
+        "provider": "openrouter",
+        "capabilities": ["beta", "video"],
+        "context_length": None,
+        "pricing": {"video": "0.01"},
+        "pricing_display": "Video: $0.01",
+    },
+]
+
+HttpsUrl = Annotated[AnyUrl, UrlConstraints(allowed_schemes=["https"])]
+NonEmptyStr = Annotated[str, Field(min_length=1)]
+
+
+class _MediaItem(BaseModel):
+    id: str
+    titolo: NonEmptyStr
+    testo_post: NonEmptyStr
+    original_url: HttpsUrl
+    thumbnail_url: HttpsUrl
+    image_url: HttpsUrl
+    image_base64: NonEmptyStr
+    success_score: float
+    pubblicato_il: str
+    transcript: Optional[str]
+
+
+_MEDIA_ITEMS = TypeAdapter(List[_MediaItem])
+
+
+@pytest.fixture(autouse=True)
+def _reset_influencer_store() -> Iterator[None]:
+    """Start and finish every test with an empty influencer store."""
 
-    async def close(self) -> None:
-        self.closed = True
+    store = get_influencer_store()
+    store.clear()
+    yield
+    store.clear()
 
 
-class StubImageClient:
-    """Minimal stub implementing the OpenRouter image client interface."""
+_API_METHODS = (
+    "list_models",
+    "generate_text",
+    "count_tokens",
+    "generate_image",
+    "generate_video",
+)
 
-    def __init__(self, *, result=None, error: Exception | None = None) -> None:
-        self._result = result
-        self._error = error
-        self.closed = False
-        self.calls: list[dict] = []
 
-    async def generate_image(self, **kwargs):
-        self.calls.append(kwargs)
-        if self._error is not None:
-            raise self._error
-        return self._result
+def _stub_client(
+    result: Any = None, error: Optional[Exception] = None
+) -> NonCallableMagicMock:
+    """Return an autospecced ``OpenRouterClient`` whose API methods yield ``result``.
 
-    async def close(self) -> None:
-        self.closed = True
+    When ``error`` is given every API method raises it instead. Because the mock
+    follows the real signatures, a route calling a method incorrectly fails.
+    """
 
+    client = create_autospec(OpenRouterClient, instance=True)
+    for name in _API_METHODS:
+        method = getattr(client, name)
+        method.return_value = result
+        method.side_effect = error
+    return client
 
-class StubTokenClient:
-    """Stub client for exercising the token counting endpoint."""
 
-    def __init__(self, *, result=None, error: Exception | None = None) -> None:
-        self._result = result or {
-            "prompt_tokens": 12,
-            "completion_tokens": 0,
-            "total_tokens": 12,
-        }
-        self._error = error
-        self.calls: list[tuple[str, str]] = []
-        self.closed = False
+def _awaited_call(client: NonCallableMagicMock, name: str) -> Dict[str, Any]:
+    """Assert ``name`` was awaited once and return its arguments keyed by name."""
 
-    async def count_tokens(self, model: str, prompt: str):
-        self.calls.append((model, prompt))
-        if self._error is not None:
-            raise self._error
-        return self._result
+    method = getattr(client, name)
+    method.assert_awaited_once()
+    args, kwargs = method.await_args
+    bound = inspect.signature(getattr(OpenRouterClient, name)).bind(
+        client, *args, **kwargs
+    )
+    arguments = dict(bound.arguments)
+    arguments.pop("self")
+    return arguments
 
-    async def close(self) -> None:
-        self.closed = True
 
+def test_healthcheck_returns_ok_payload(client: TestClient):
+    response = client.get("/healthz")
 
-def _clear_overrides() -> None:
-    app.dependency_overrides.pop(get_client, None)
+    assert response.status_code == 200
+    assert response.content == b'{"status":"ok"}'
 
 
-class StubVideoClient:
-    """Minimal stub implementing the OpenRouter video client interface."""
+def test_docs_endpoint_is_available(client: TestClient):
+    response = client.get("/docs")
 
-    def __init__(self, result=None, error: Optional[Exception] = None):
-        self._result = result
-        self._error = error
-        self.closed = False
-        self.calls: list[dict] = []
+    assert response.status_code == 200
+    assert "Swagger UI" in response.text
 
-    async def generate_video(self, **kwargs):
-        self.calls.append(kwargs)
-        if self._error is not None:
-            raise self._error
-        return self._result
 
-    async def close(self):
-        self.closed = True
+def test_openapi_schema_is_available(client: TestClient):
+    response = client.get("/openapi.json")
 
+    assert response.status_code == 200
+    schema = response.json()
+    assert schema["info"]["title"] == "AI Influencer Control Hub"
 
-def override_client(client_stub: StubVideoClient) -> None:
-    async def _get_client() -> StubVideoClient:
-        return client_stub
 
-    app.dependency_overrides[get_client] = _get_client
+def test_list_models_returns_summarized_payload_and_closes_client(
+    client: TestClient, override_dep
+):
+    stub = override_dep(get_client, _stub_client(_STUB_MODELS))
 
+    response = client.get("/api/models")
 
-def reset_overrides() -> None:
-    app.dependency_overrides.pop(get_client, None)
+    assert response.status_code == 200
+    assert response.json() == {"models": EXPECTED_MODELS}
+    stub.list_models.assert_awaited_once_with()
+    stub.close.assert_awaited_once()
 
 
-def test_generate_image_returns_remote_url_and_closes_client():
-    stub_client = StubImageClient(
-        result={"data": [{"url": "https://cdn.example.com/image.png"}]}
+def test_list_models_handles_openrouter_error_and_closes_client(
+    client: TestClient, override_dep
+):
+    stub = override_dep(
+        get_client, _stub_client(error=OpenRouterError("Unable to fetch"))
     )
 
-    async def _override() -> StubImageClient:
-        return stub_client
-
-    app.dependency_overrides[get_client] = _override
-    try:
-        response = client.post(
-            "/api/generate/image",
-            json={"model": "stub", "prompt": "draw", **DEFAULT_CONTEXT},
-        )
-    finally:
-        reset_overrides()
-
-    assert response.status_code == 200
-    assert response.json() == {
-        "image": "https://cdn.example.com/image.png",
-        "is_remote": True,
-    }
-    assert len(stub_client.calls) == 1
-    prompt = stub_client.calls[0]["prompt"]
-    assert DEFAULT_CONTEXT["story"] in prompt
-    assert DEFAULT_CONTEXT["personality"] in prompt
-    assert stub_client.closed is True
-
+    response = client.get("/api/models")
 
-def test_generate_image_returns_inline_base64_and_closes_client():
-    inline = base64.b64encode(b"pixel").decode()
-    stub_client = StubImageClient(result={"data": [{"b64_json": inline}]})
+    assert response.status_code == 502
+    assert response.content == b'{"detail":"Unable to fetch"}'
+    stub.close.assert_awaited_once()
 
-    async def _override() -> StubImageClient:
-        return stub_client
 
-    app.dependency_overrides[get_client] = _override
-    try:
-        response = client.post(
+@pytest.mark.parametrize(
+    "path, body, result, error, status, expected",
+    [
+        pytest.param(
             "/api/generate/image",
-            json={"model": "stub", "prompt": "draw", **DEFAULT_CONTEXT},
-        )
-    finally:
-        reset_overrides()
-
-    assert response.status_code == 200
-    assert response.json() == {"image": inline, "is_remote": False}
-    assert len(stub_client.calls) == 1
-    prompt = stub_client.calls[0]["prompt"]
-    assert DEFAULT_CONTEXT["story"] in prompt
-    assert DEFAULT_CONTEXT["personality"] in prompt
-    assert stub_client.closed is True
-
-
-def test_generate_image_handles_missing_payload_and_closes_client():
-    stub_client = StubImageClient(result={})
-
-    async def _override() -> StubImageClient:
-        return stub_client
-
-    app.dependency_overrides[get_client] = _override
-    try:
-        response = client.post(
+            _IMAGE_BODY,
+            _REMOTE_IMAGE_PAYLOAD,
+            None,
+            200,
+            {"image": "https://cdn.example.com/image.png", "is_remote": True},
+            id="image-remote-url",
+        ),
+        pytest.param(
             "/api/generate/image",
-            json={"model": "stub", "prompt": "draw", **DEFAULT_CONTEXT},
-        )
-    finally:
-        reset_overrides()
-
-    assert response.status_code == 500
-    assert response.json() == {"detail": "Unexpected image payload"}
-    assert stub_client.closed is True
+            _IMAGE_BODY,
+            _INLINE_IMAGE_PAYLOAD,
+            None,
+            200,
+            {"image": _INLINE_PIXEL_B64, "is_remote": False},
+            id="image-inline-base64",
+        ),
+        pytest.param(
+            "/api/generate/image",
+            _IMAGE_BODY,
+            {},
+            None,
+            500,
+            {"detail": "Unexpected image payload"},
+            id="image-missing-payload",
+        ),
+        pytest.param(
+            "/api/generate/image",
+            _IMAGE_BODY,
+            _BAD_B64_IMAGE_PAYLOAD,
+            None,
+            500,
+            {"detail": "Invalid image encoding"},
+            id="image-invalid-base64",
+        ),
+        pytest.param(
+            "/api/generate/video",
+            _VIDEO_BODY,
+            {"data": [{"url": "https://cdn.example/video.mp4"}]},
+            None,
+            200,
+            {"video": "https://cdn.example/video.mp4", "is_remote": True},
+            id="video-remote-url",
+        ),
+        pytest.param(
+            "/api/generate/video",
+            _VIDEO_BODY,
+            {"data": [{"b64_json": _INLINE_VIDEO_B64}]},
+            None,
+            200,
+            {"video": _INLINE_VIDEO_B64, "is_remote": False},
+            id="video-inline-base64",
+        ),
+        pytest.param(
+            "/api/generate/video",
+            _VIDEO_BODY,
+            {"meta": {"usage": "test"}},
+            None,
+            500,
+            {"detail": "Unexpected video payload"},
+            id="video-missing-entries",
+        ),
+        pytest.param(
+            "/api/generate/video",
+            _VIDEO_BODY,
+            {"data": ["not-a-dict"]},
+            None,
+            500,
+            {"detail": "Invalid video payload"},
+            id="video-non-dict-blob",
+        ),
+        pytest.param(
+            "/api/generate/video",
+            _VIDEO_BODY,
+            None,
+            OpenRouterError("backend unavailable"),
+            502,
+            {"detail": "backend unavailable"},
+            id="video-openrouter-error",
+        ),
+        pytest.param(
+            "/api/generate/text",
+            _TEXT_BODY,
+            "expected text",
+            None,
+            200,
+            {"content": "expected text"},
+            id="text-content",
+        ),
+        pytest.param(
+            "/api/generate/text",
+            _TEXT_BODY,
+            None,
+            OpenRouterError("stub failure"),
+            502,
+            {"detail": "stub failure"},
+            id="text-openrouter-error",
+        ),
+    ],
+)
+def test_generate_maps_payload_and_closes_client(
+    client: TestClient,
+    override_dep,
+    path: str,
+    body: bytes,
+    result,
+    error: Optional[Exception],
+    status: int,
+    expected: dict,
+) -> None:
+    stub = override_dep(get_client, _stub_client(result, error=error))
 
+    response = client.post(path, content=body, headers=_JSON_HEADERS)
 
-def test_generate_image_handles_invalid_base64_and_closes_client():
-    stub_client = StubImageClient(
-        result={"data": [{"b64_json": "not-base64??"}]}
-    )
+    assert response.status_code == status
+    assert response.json() == expected
+    request = orjson.loads(body)
+    call = _awaited_call(stub, _ROUTE_METHODS[path])
+    assert call["model"] == request["model"]
+    assert request["prompt"] in call["prompt"]
+    assert DEFAULT_CONTEXT["story"] in call["prompt"]
+    assert DEFAULT_CONTEXT["personality"] in call["prompt"]
+    stub.close.assert_awaited_once()
 
-    async def _override() -> StubImageClient:
-        return stub_client
 
-    app.dependency_overrides[get_client] = _override
-    try:
-        response = client.post(
+@pytest.mark.parametrize(
+    "path, model, prompt, result",
+    [
+        pytest.param(
             "/api/generate/image",
-            json={"model": "stub", "prompt": "draw", **DEFAULT_CONTEXT},
-        )
-    finally:
-        reset_overrides()
-
-    assert response.status_code == 500
-    assert response.json() == {"detail": "Invalid image encoding"}
-    assert stub_client.closed is True
-
+            "stub",
+            "Visionary portrait",
+            {"data": [{"url": "https://cdn.example.com/store.png"}]},
+            id="image",
+        ),
+        pytest.param(
+            "/api/generate/video",
+            "demo/video",
+            "Create a teaser",
+            {"data": [{"url": "https://cdn.example/store-video.mp4"}]},
+            id="video",
+        ),
+        pytest.param(
+            "/api/generate/text",
+            "meta/llama",
+            "Racconta un messaggio motivazionale",
+            "contextualized",
+            id="text",
+        ),
+    ],
+)
+def test_generate_enriches_prompt_with_store_context(
+    client: TestClient, override_dep, path: str, model: str, prompt: str, result
+) -> None:
+    stub = override_dep(get_client, _stub_client(result))
 
-def test_generate_image_enriches_prompt_with_store_context():
-    stub_client = StubImageClient(
-        result={"data": [{"url": "https://cdn.example.com/store.png"}]}
+    response = client.post(
+        path,
+        json={"model": model, "prompt": prompt, "influencer_id": "Aurora_Rise"},
     )
 
-    async def _override() -> StubImageClient:
-        return stub_client
-
-    app.dependency_overrides[get_client] = _override
-    try:
-        response = client.post(
-            "/api/generate/image",
-            json={
-                "model": "stub",
-                "prompt": "Visionary portrait",
-                "influencer_id": "Aurora_Rise",
-            },
-        )
-    finally:
-        reset_overrides()
-
     assert response.status_code == 200
-    assert stub_client.closed is True
-    assert len(stub_client.calls) == 1
-    prompt = stub_client.calls[0]["prompt"]
+    stub.close.assert_awaited_once()
+    forwarded = _awaited_call(stub, _ROUTE_METHODS[path])["prompt"]
     context = INFLUENCER_STORE["aurora_rise"]
-    assert context["story"] in prompt
-    assert context["personality"] in prompt
+    assert context["story"] in forwarded
+    assert context["personality"] in forwarded
 
 
-def test_create_influencer_persists_story_and_personality() -> None:
-    store = get_influencer_store()
-    store.clear()
-    try:
-        response = client.post(
+def test_create_influencer_persists_story_and_personality(run_scenario) -> None:
+    async def scenario(aclient: httpx.AsyncClient) -> None:
+        response = await aclient.post(
             "/api/influencers",
             json={
                 "identifier": "@socialstar",
@@ -353,59 +391,59 @@ def test_create_influencer_persists_story_and_personality() -> None:
         assert created["story"] == "From humble beginnings to viral sensation."
         assert created["personality"] == "Charismatic and witty"
 
-        lookup = client.post(
-            "/api/influencer",
-            json={"identifier": "@socialstar", "method": "official"},
+        stored, lookup = await asyncio.gather(
+            aclient.get("/api/influencers/socialstar"),
+            aclient.post(
+                "/api/influencer",
+                json={"identifier": "@socialstar", "method": "official"},
+            ),
         )
 
+        assert stored.status_code == 200
+        assert stored.json()["story"] == "From humble beginnings to viral sensation."
         assert lookup.status_code == 200
         payload = lookup.json()
         assert payload["story"] == "From humble beginnings to viral sensation."
         assert payload["personality"] == "Charismatic and witty"
         assert payload["profile"]["handle"] == "@socialstar"
-    finally:
-        store.clear()
 
+    run_scenario(scenario)
 
 
-def test_get_influencer_returns_stored_metadata() -> None:
+def test_get_influencer_returns_stored_metadata(client: TestClient) -> None:
     store = get_influencer_store()
-    store.clear()
-    try:
-        record = store.create(
-            identifier="@socialstar",
-            story="From humble beginnings to viral sensation.",
-            personality="Charismatic and witty",
-        )
-        record.lora_model = "models/lora/socialstar.safetensors"
-        record.contents = [
-            {"id": "c1", "title": "Highlight reel"},
-            {"id": "c2", "title": "Behind the scenes"},
-        ]
-
-        response = client.get("/api/influencers/socialstar")
-
-        assert response.status_code == 200
-        payload = response.json()
-        assert payload["handle"] == "@socialstar"
-        assert payload["identifier"] == "socialstar"
-        assert payload["story"] == "From humble beginnings to viral sensation."
-        assert payload["personality"] == "Charismatic and witty"
-        assert payload["lora_model"] == "models/lora/socialstar.safetensors"
-        assert payload["contents"] == [
-            {"id": "c1", "title": "Highlight reel"},
-            {"id": "c2", "title": "Behind the scenes"},
-        ]
-        assert "created_at" in payload
-    finally:
-        store.clear()
+    record = store.create(
+        identifier="@socialstar",
+        story="From humble beginnings to viral sensation.",
+        personality="Charismatic and witty",
+    )
+    record.lora_model = "models/lora/socialstar.safetensors"
+    record.contents = [
+        {"id": "c1", "title": "Highlight reel"},
+        {"id": "c2", "title": "Behind the scenes"},
+    ]
 
+    response = client.get("/api/influencers/socialstar")
 
-def test_create_influencer_with_lora_and_contents_and_retrieve() -> None:
-    store = get_influencer_store()
-    store.clear()
-    try:
-        response = client.post(
+    assert response.status_code == 200
+    payload = response.json()
+    assert payload["handle"] == "@socialstar"
+    assert payload["identifier"] == "socialstar"
+    assert payload["story"] == "From humble beginnings to viral sensation."
+    assert payload["personality"] == "Charismatic and witty"
+    assert payload["lora_model"] == "models/lora/socialstar.safetensors"
+    assert payload["contents"] == [
+        {"id": "c1", "title": "Highlight reel"},
+        {"id": "c2", "title": "Behind the scenes"},
+    ]
+    assert "created_at" in payload
+
+
+def test_create_influencer_with_lora_and_contents_and_retrieve(
+    run_scenario,
+) -> None:
+    async def scenario(aclient: httpx.AsyncClient) -> None:
+        response = await aclient.post(
             "/api/influencers",
             json={
                 "identifier": "@stellar_voice",
@@ -421,32 +459,34 @@ def test_create_influencer_with_lora_and_contents_and_retrieve() -> None:
         assert created["lora_model"] == "loras/stellar.safetensors"
         assert created["contents"] == ["Galaxy guide", "Deep space podcast"]
 
-        lookup = client.get("/api/influencers/stellar_voice")
-        assert lookup.status_code == 200
-        payload = lookup.json()
+        stored, lookup = await asyncio.gather(
+            aclient.get("/api/influencers/stellar_voice"),
+            aclient.post(
+                "/api/influencer",
+                json={"identifier": "@stellar_voice", "method": "official"},
+            ),
+        )
+
+        assert stored.status_code == 200
+        payload = stored.json()
         assert payload["handle"] == "@stellar_voice"
         assert payload["lora_model"] == "loras/stellar.safetensors"
         assert payload["contents"] == ["Galaxy guide", "Deep space podcast"]
         assert payload["story"] == "Interstellar traveler sharing cosmic tales."
         assert payload["personality"] == "Warm and inquisitive"
-    finally:
-        store.clear()
-
+        assert lookup.status_code == 200
+        assert lookup.json()["lora_model"] == "loras/stellar.safetensors"
 
-def test_get_influencer_returns_404_for_missing_record() -> None:
-    store = get_influencer_store()
-    store.clear()
-    try:
+    run_scenario(scenario)
 
-        response = client.get("/api/influencers/unknown")
-        assert response.status_code == 404
-        assert response.json() == {"detail": "Influencer non trovato"}
 
-    finally:
-        store.clear()
+def test_get_influencer_returns_404_for_missing_record(client: TestClient) -> None:
+    response = client.get("/api/influencers/unknown")
+    assert response.status_code == 404
+    assert response.content == b'{"detail":"Influencer non trovato"}'
 
 
-def test_influencer_lookup_returns_enriched_media():
+def test_influencer_lookup_returns_enriched_media(client: TestClient):
     response = client.post(
         "/api/influencer",
         json={"identifier": "@socialstar", "method": "official"},
@@ -459,58 +499,50 @@ def test_influencer_lookup_returns_enriched_media():
     assert len(media) == 10
 
     success_scores = [item["success_score"] for item in media]
-    assert success_scores == sorted(success_scores, reverse=True)
-
-    for item in media:
-        assert item["id"].startswith("socialstar-top-")
-        assert item["titolo"]
-        assert item["testo_post"]
-        assert item["original_url"].startswith("https://")
-        assert item["thumbnail_url"].startswith("https://")
-        assert item["image_url"].startswith("https://")
-        assert isinstance(item["image_base64"], str)
-        assert "success_score" in item
-        assert "pubblicato_il" in item
-        assert "transcript" in item
-
-
-def test_influencer_lookup_includes_store_specific_data() -> None:
+    assert all(x >= y for x, y in zip(success_scores, success_scores[1:]))
+
+    items = _MEDIA_ITEMS.validate_python(media)
+    assert all(item.id.startswith("socialstar-top-") for item in items)
+
+    sample = media[0]
+    assert base64.b64decode(sample["image_base64"], validate=True)
+
+
+def test_influencer_lookup_includes_store_specific_data(client: TestClient) -> None:
     store = get_influencer_store()
-    store.clear()
-    try:
-        record = store.create(
-            identifier="@aurora_rise",
-            story="Explorer of cosmic stories.",
-            personality="Inspiring dreamer",
-        )
-        record.lora_model = "models/lora/aurora.safetensors"
-        record.contents = [{"id": "m1", "title": "Starlight"}]
+    record = store.create(
+        identifier="@aurora_rise",
+        story="Explorer of cosmic stories.",
+        personality="Inspiring dreamer",
+    )
+    record.lora_model = "models/lora/aurora.safetensors"
+    record.contents = [{"id": "m1", "title": "Starlight"}]
 
-        response = client.post(
-            "/api/influencer",
-            json={"identifier": "@aurora_rise", "method": "official"},
-        )
+    response = client.post(
+        "/api/influencer",
+        json={"identifier": "@aurora_rise", "method": "official"},
+    )
 
-        assert response.status_code == 200
-        payload = response.json()
-        assert payload["lora_model"] == "models/lora/aurora.safetensors"
-        assert payload["contents"] == [{"id": "m1", "title": "Starlight"}]
-    finally:
-        store.clear()
+    assert response.status_code == 200
+    payload = response.json()
+    assert payload["lora_model"] == "models/lora/aurora.safetensors"
+    assert payload["contents"] == [{"id": "m1", "title": "Starlight"}]
 
 
 @pytest.mark.parametrize("identifier", ["", "   "])
-def test_influencer_lookup_requires_identifier(identifier: str) -> None:
+def test_influencer_lookup_requires_identifier(
+    client: TestClient, identifier: str
+) -> None:
     response = client.post(
         "/api/influencer",
         json={"identifier": identifier, "method": "official"},
     )
 
     assert response.status_code == 422
-    assert response.json() == {"detail": "Identifier is required"}
+    assert response.content == b'{"detail":"Identifier is required"}'
 
 
-def test_influencer_lookup_normalizes_handle_from_urls() -> None:
+def test_influencer_lookup_normalizes_handle_from_urls(client: TestClient) -> None:
     response = client.post(
         "/api/influencer",
         json={
@@ -527,14 +559,16 @@ def test_influencer_lookup_normalizes_handle_from_urls() -> None:
     assert payload["profile"]["piattaforma"] == "Instagram"
 
 
-def test_influencer_lookup_returns_not_found_for_invalid_handles() -> None:
+def test_influencer_lookup_returns_not_found_for_invalid_handles(
+    client: TestClient,
+) -> None:
     response = client.post(
         "/api/influencer",
         json={"identifier": "@invalid_creator", "method": "official"},
     )
 
     assert response.status_code == 404
-    assert response.json() == {"detail": "Influencer non trovato"}
+    assert response.content == b'{"detail":"Influencer non trovato"}'
 
 
 @pytest.mark.parametrize(
@@ -547,7 +581,7 @@ def test_influencer_lookup_returns_not_found_for_invalid_handles() -> None:
     ],
 )
 def test_influencer_lookup_sets_platform_and_metrics_for_scrape_method(
-    identifier: str, expected_platform: str
+    client: TestClient, identifier: str, expected_platform: str
 ) -> None:
     response = client.post(
         "/api/influencer",
@@ -569,266 +603,143 @@ def test_influencer_lookup_sets_platform_and_metrics_for_scrape_method(
     )
 
 
-def test_generate_video_returns_remote_url():
-    stub = StubVideoClient({"data": [{"url": "https://cdn.example/video.mp4"}]})
-    override_client(stub)
-    try:
-        response = client.post(
-            "/api/generate/video",
-            json={
-                "model": "demo/video",
-                "prompt": "A sunny day",
-                **DEFAULT_CONTEXT,
-            },
-        )
-    finally:
-        reset_overrides()
+def test_count_tokens_returns_usage_payload_and_closes_client(
+    client: TestClient, override_dep
+) -> None:
+    stub = override_dep(
+        get_client,
+        _stub_client(
+            {"prompt_tokens": 128, "completion_tokens": 64, "total_tokens": 192}
+        ),
+    )
 
-    assert response.status_code == 200
-    assert response.json() == {
-        "video": "https://cdn.example/video.mp4",
-        "is_remote": True,
-    }
-    assert len(stub.calls) == 1
-    prompt = stub.calls[0]["prompt"]
-    assert DEFAULT_CONTEXT["story"] in prompt
-    assert DEFAULT_CONTEXT["personality"] in prompt
-    assert stub.closed is True
-
-
-def test_generate_video_returns_inline_base64_payload():
-    stub = StubVideoClient({"data": [{"b64_json": "ZmFrZS12aWRlby1kYXRh"}]})
-    override_client(stub)
-    try:
-        response = client.post(
-            "/api/generate/video",
-            json={
-                "model": "demo/video",
-                "prompt": "A futuristic city",
-                **DEFAULT_CONTEXT,
-            },
-        )
-    finally:
-        reset_overrides()
+    response = client.post(
+        "/api/tokenize",
+        content=_TOKENIZE_BODY,
+        headers=_JSON_HEADERS,
+    )
 
     assert response.status_code == 200
     assert response.json() == {
-        "video": "ZmFrZS12aWRlby1kYXRh",
-        "is_remote": False,
+        "usage": {
+            "prompt_tokens": 128,
+            "completion_tokens": 64,
+            "total_tokens": 192,
+        }
     }
-    assert len(stub.calls) == 1
-    prompt = stub.calls[0]["prompt"]
-    assert DEFAULT_CONTEXT["story"] in prompt
-    assert DEFAULT_CONTEXT["personality"] in prompt
-    assert stub.closed is True
-
-
-def test_generate_video_enriches_prompt_with_store_context():
-    stub = StubVideoClient({"data": [{"url": "https://cdn.example/store-video.mp4"}]})
-    override_client(stub)
-    try:
-        response = client.post(
-            "/api/generate/video",
-            json={
-                "model": "demo/video",
-                "prompt": "Create a teaser",
-                "influencer_id": "Aurora_Rise",
-            },
-        )
-    finally:
-        reset_overrides()
-
-    assert response.status_code == 200
-    assert stub.closed is True
-    assert len(stub.calls) == 1
-    prompt = stub.calls[0]["prompt"]
-    context = INFLUENCER_STORE["aurora_rise"]
-    assert context["story"] in prompt
-    assert context["personality"] in prompt
-
-
-def test_generate_video_missing_entries_returns_error():
-    stub = StubVideoClient({"meta": {"usage": "test"}})
-    override_client(stub)
-    try:
-        response = client.post(
-            "/api/generate/video",
-            json={
-                "model": "demo/video",
-                "prompt": "Missing entries",
-                **DEFAULT_CONTEXT,
-            },
-        )
-    finally:
-        reset_overrides()
-
-    assert response.status_code == 500
-    assert response.json() == {"detail": "Unexpected video payload"}
-    assert stub.closed is True
-
-
-def test_generate_video_with_non_dict_blob_returns_error():
-    stub = StubVideoClient({"data": ["not-a-dict"]})
-    override_client(stub)
-    try:
-        response = client.post(
-            "/api/generate/video",
-            json={
-                "model": "demo/video",
-                "prompt": "Invalid entry",
-                **DEFAULT_CONTEXT,
-            },
-        )
-    finally:
-        reset_overrides()
-
-    assert response.status_code == 500
-    assert response.json() == {"detail": "Invalid video payload"}
-    assert stub.closed is True
-
-
-def test_generate_video_propagates_openrouter_errors():
-    stub = StubVideoClient(error=OpenRouterError("backend unavailable"))
-    override_client(stub)
-    try:
-        response = client.post(
-            "/api/generate/video",
-            json={
-                "model": "demo/video",
-                "prompt": "Should fail",
-                **DEFAULT_CONTEXT,
-            },
-        )
-    finally:
-        reset_overrides()
-
-    assert response.status_code == 502
-    assert response.json() == {"detail": "backend unavailable"}
-    assert stub.closed is True
-
-def test_generate_text_uses_stubbed_client_and_closes() -> None:
-    stub = StubTextClient(result="expected text")
+    assert _awaited_call(stub, "count_tokens") == {
+        "model": "meta/llama",
+        "prompt": "Sample",
+    }
+    stub.close.assert_awaited_once()
 
-    async def override_client() -> StubTextClient:
-        return stub
 
-    app.dependency_overrides[get_client] = override_client
+def test_count_tokens_returns_502_on_openrouter_error(
+    client: TestClient, override_dep
+) -> None:
+    stub = override_dep(
+        get_client, _stub_client(error=OpenRouterError("quota exceeded"))
+    )
 
     response = client.post(
-        "/api/generate/text",
-        json={"model": "meta/llama", "prompt": "Hello", **DEFAULT_CONTEXT},
+        "/api/tokenize",
+        content=_TOKENIZE_BODY,
+        headers=_JSON_HEADERS,
     )
 
-    try:
-        assert response.status_code == 200
-        assert response.json() == {"content": "expected text"}
-        assert len(stub.calls) == 1
-        model, prompt = stub.calls[0]
-        assert model == "meta/llama"
-        assert "Hello" in prompt
-        assert DEFAULT_CONTEXT["story"] in prompt
-        assert DEFAULT_CONTEXT["personality"] in prompt
-        assert stub.closed is True
-    finally:
-        _clear_overrides()
+    assert response.status_code == 502
+    assert response.content == b'{"detail":"quota exceeded"}'
+    stub.close.assert_awaited_once()
 
 
-def test_generate_text_returns_502_on_openrouter_error() -> None:
-    stub = StubTextClient(error=OpenRouterError("stub failure"))
+@pytest.fixture
+def mock_openrouter(
+    override_dep, monkeypatch: pytest.MonkeyPatch
+) -> Callable[[Dict[str, httpx.Response]], OpenRouterClient]:
+    """Serve ``get_client`` with a real client backed by canned HTTP responses.
 
-    async def override_client() -> StubTextClient:
-        return stub
+    ``close`` is wrapped in an ``AsyncMock`` so tests can assert the route
+    awaited it while the real shutdown still runs.
+    """
 
-    app.dependency_overrides[get_client] = override_client
+    def _install(route_map: Dict[str, httpx.Response]) -> OpenRouterClient:
+        async def handler(request: httpx.Request) -> httpx.Response:
+            for path, response in route_map.items():
+                if request.url.path.endswith(path):
+                    return response
+            return httpx.Response(404, json={"detail": "not found"})
 
-    response = client.post(
-        "/api/generate/text",
-        json={"model": "meta/llama", "prompt": "Hello", **DEFAULT_CONTEXT},
-    )
+        openrouter = OpenRouterClient(transport=httpx.MockTransport(handler))
+        monkeypatch.setattr(openrouter, "close", AsyncMock(wraps=openrouter.close))
+        return override_dep(get_client, openrouter)
 
-    try:
-        assert response.status_code == 502
-        assert response.json() == {"detail": "stub failure"}
-        assert stub.closed is True
-    finally:
-        _clear_overrides()
+    return _install
 
 
-def test_generate_text_enriches_prompt_with_store_context() -> None:
-    stub = StubTextClient(result="contextualized")
-
-    async def override_client() -> StubTextClient:
-        return stub
-
-    app.dependency_overrides[get_client] = override_client
+def test_generate_text_parses_chunked_upstream_content(
+    client: TestClient, mock_openrouter
+) -> None:
+    openrouter = mock_openrouter(
+        {
+            "/chat/completions": httpx.Response(
+                200,
+                json={
+                    "choices": [
+                        {"message": {"content": [{"text": "ciao "}, {"text": "mondo"}]}}
+                    ]
+                },
+            )
+        }
+    )
 
     response = client.post(
         "/api/generate/text",
-        json={
-            "model": "meta/llama",
-            "prompt": "Racconta un messaggio motivazionale",
-            "influencer_id": "Aurora_Rise",
-        },
+        content=_TEXT_BODY,
+        headers=_JSON_HEADERS,
     )
 
-    try:
-        assert response.status_code == 200
-        assert stub.closed is True
-        assert len(stub.calls) == 1
-        _, prompt = stub.calls[0]
-        context = INFLUENCER_STORE["aurora_rise"]
-        assert context["story"] in prompt
-        assert context["personality"] in prompt
-    finally:
-        _clear_overrides()
-
-
-def test_count_tokens_returns_usage_payload_and_closes_client() -> None:
-    stub = StubTokenClient(
-        result={"prompt_tokens": 128, "completion_tokens": 64, "total_tokens": 192}
-    )
+    assert response.status_code == 200
+    assert response.content == b'{"content":"ciao mondo"}'
+    openrouter.close.assert_awaited_once()
 
-    async def override_client() -> StubTokenClient:
-        return stub
 
-    app.dependency_overrides[get_client] = override_client
+def test_count_tokens_normalizes_upstream_usage(
+    client: TestClient, mock_openrouter
+) -> None:
+    openrouter = mock_openrouter(
+        {
+            "/tokenize": httpx.Response(
+                200, json={"usage": {"input_tokens": "3"}, "tokens": [1, 2, 3, 4]}
+            )
+        }
+    )
 
     response = client.post(
         "/api/tokenize",
-        json={"model": "meta/llama", "prompt": "Sample"},
+        content=_TOKENIZE_BODY,
+        headers=_JSON_HEADERS,
     )
 
-    try:
-        assert response.status_code == 200
-        assert response.json() == {
-            "usage": {
-                "prompt_tokens": 128,
-                "completion_tokens": 64,
-                "total_tokens": 192,
-            }
-        }
-        assert stub.calls == [("meta/llama", "Sample")]
-        assert stub.closed is True
-    finally:
-        _clear_overrides()
-
-
-def test_count_tokens_returns_502_on_openrouter_error() -> None:
-    stub = StubTokenClient(error=OpenRouterError("quota exceeded"))
+    assert response.status_code == 200
+    assert response.json() == {
+        "usage": {"prompt_tokens": 3, "completion_tokens": 1, "total_tokens": 4}
+    }
+    openrouter.close.assert_awaited_once()
 
-    async def override_client() -> StubTokenClient:
-        return stub
 
-    app.dependency_overrides[get_client] = override_client
+def test_generate_image_maps_upstream_failure_to_502(
+    client: TestClient, mock_openrouter
+) -> None:
+    openrouter = mock_openrouter(
+        {"/images": httpx.Response(503, json={"error": "overloaded"})}
+    )
 
     response = client.post(
-        "/api/tokenize",
-        json={"model": "meta/llama", "prompt": "Sample"},
+        "/api/generate/image",
+        content=_IMAGE_BODY,
+        headers=_JSON_HEADERS,
     )
 
-    try:
-        assert response.status_code == 502
-        assert response.json() == {"detail": "quota exceeded"}
-        assert stub.closed is True
-    finally:
-        _clear_overrides()
+    assert response.status_code == 502
+    assert response.json()["detail"].startswith("Image generation failed: 503")
+    openrouter.close.assert_awaited_once()